@@ -5,53 +5,809 @@ Automated script to check ferry availability and send Telegram notifications
 """
 
 import os
+import re
+import queue
+import atexit
+import json
 import sys
+import glob
+import gzip
+import time
 import asyncio
 import logging
+import logging.handlers
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
+from hashlib import blake2b
+from urllib.parse import urlsplit
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
+try:
+    # libuv-based event loop, cheaper per callback for Playwright's chatty driver pipe
+    import uvloop
+except ImportError:  # Not available on Windows
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+# Text-based availability keywords, each list compiled into one case-insensitive scan
+AVAILABILITY_KEYWORDS = [
+    'select sailing', 'book now', 'available', 'choose time',
+    'price:', '£', 'fare', 'continue to booking'
+]
+UNAVAILABLE_KEYWORDS = [
+    'not available', 'sold out', 'fully booked', 'no sailings',
+    'no availability', 'service not operating'
+]
+AVAIL_RE = re.compile('|'.join(map(re.escape, AVAILABILITY_KEYWORDS)), re.I)
+UNAVAIL_RE = re.compile('|'.join(map(re.escape, UNAVAILABLE_KEYWORDS)), re.I)
+
+# Browser profile reused between runs (HTTP cache, cookies, local storage)
+PROFILE_DIR = '.pw-profile'
+
+# Results page hash and verdict from the previous check
+LAST_RESULT_FILE = 'logs/.last_result.json'
+
+# How many past checks each results indicator selector matched in
+SELECTOR_HITS_FILE = 'logs/.selector_hits.json'
+
+# Compressed results page dumps kept in logs/, oldest pruned first
+MAX_RESULT_DUMPS = 20
+
+# Validators, body hash and verdict from the last API probe, for conditional requests
+API_PROBE_CACHE_FILE = 'logs/.api_probe_cache.json'
+
+# Trip the check searches for - the booking form is always filled with these values
+DEPARTURE_PORT = 'Troon'
+ARRIVAL_PORT = 'Brodick'
+OUTBOUND_DATE = '2025-08-03'
+RETURN_DATE = '2025-08-05'
+ADULTS = CHILDREN = INFANTS = '1'
+TRIP = f'{DEPARTURE_PORT}-{ARRIVAL_PORT} {OUTBOUND_DATE}/{RETURN_DATE}'
+
+# How long (seconds) the last verdict for TRIP is reused outright
+VERDICT_TTL = 600
+
+# Headers left out of captured API requests, which end up in uploaded logs
+SENSITIVE_HEADERS = {'authorization', 'cookie', 'x-auth-token'}
+
+# Chromium flags shared with debug_website.py
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-web-security',
+    '--disable-blink-features=AutomationControlled'
+]
+
+# Resources the checker never reads - aborting them keeps page loads lean. Stylesheets
+# still load because element visibility depends on them
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+BLOCKED_HOSTS = ('google-analytics', 'googletagmanager', 'doubleclick', 'facebook', 'hotjar')
+
+# Start booking buttons on the welcoming page
+BOOKING_SELECTORS = (
+    'button:has-text("Start booking")',
+    'button:has-text("Book")',
+    'a:has-text("Start")',
+    '.start-booking',
+    '.booking-button',
+    'button[data-testid*="start"]',
+    'button[data-testid*="book"]'
+)
+
+# Return journey toggle
+RETURN_SELECTORS = (
+    'button:has-text("Return")',
+    'div:has-text("Return") button',
+    'label:has-text("Return")',
+    'input[type="radio"][value="return"]',
+    'input[name="journeyType"][value="return"]',
+    '.trip-type-btn:has-text("Return")',
+    '.journey-type:has-text("Return")',
+    '[data-test-automation*="return"]',
+    'ion-button:has-text("Return")'
+)
+
+# Departure/arrival port inputs, based on live debug output of the edea-select fields
+DEPARTURE_SELECTORS = (
+    'input[placeholder="From"][data-test-automation*="portlist"]',
+    'input[placeholder="From"]',
+    'input[data-test-automation="desktop/step1/destinations/single.edea-select.undefined.input.portlist"]:first-of-type',
+    'input[data-test-automation*="portlist"]:first-of-type',
+    'edea-select:first-of-type input[placeholder="From"]',
+    'edea-select:nth-of-type(1) input'
+)
+ARRIVAL_SELECTORS = (
+    'input[placeholder="To"][data-test-automation*="portlist"]',
+    'input[placeholder="To"]',
+    'input[data-test-automation="desktop/step1/destinations/single.edea-select.undefined.input.portlist"]:last-of-type',
+    'input[data-test-automation*="portlist"]:last-of-type',
+    'edea-select:last-of-type input[placeholder="To"]',
+    'edea-select:nth-of-type(2) input'
+)
+
+# Outbound/return date fields
+OUTBOUND_DATE_SELECTORS = (
+    'ion-datetime[data-testid*="departure"]',
+    'ion-datetime[data-testid*="outbound"]',
+    'edea-datepicker[data-testid*="departure"]',
+    'edea-datepicker[data-testid*="outbound"]',
+    'input[name*="departure"][type="date"]',
+    'input[name*="outbound"][type="date"]',
+    'input[data-testid*="departure"]',
+    'input[data-testid*="outbound"]',
+    '#departureDate',
+    '.departure-date input',
+    '.outbound-date input',
+    'input[type="date"]:first-of-type'
+)
+RETURN_DATE_SELECTORS = (
+    'input[name*="return"][type="date"]',
+    'input[name*="arrival"][type="date"]',
+    'input[data-testid*="return"]',
+    'input[data-testid*="arrival"]',
+    '#returnDate',
+    '.return-date input',
+    '.arrival-date input',
+    'input[type="date"]:nth-of-type(2)',
+    'input[type="date"]:last-of-type'
+)
+
+# Passenger count fields
+ADULT_SELECTORS = (
+    'input[name*="adult"]',
+    'input[data-testid*="adult"]',
+    'select[name*="adult"]',
+    '#adults',
+    '.adults input',
+    '.passenger input:first-of-type'
+)
+CHILD_SELECTORS = (
+    'input[name*="child"]',
+    'input[data-testid*="child"]',
+    'select[name*="child"]',
+    '#children',
+    '.children input'
+)
+INFANT_SELECTORS = (
+    'input[name*="infant"]',
+    'input[data-testid*="infant"]',
+    'select[name*="infant"]',
+    '#infants',
+    '.infants input'
+)
+
+# Add vehicle button, then the car type selector it reveals
+ADD_VEHICLE_SELECTORS = (
+    'button:has-text("Add vehicle")',
+    'button:has-text("Add car")',
+    'button[data-testid*="vehicle"]',
+    '.add-vehicle',
+    '.vehicle-add'
+)
+CAR_SELECTORS = (
+    'select[name*="vehicle"]',
+    'select[data-testid*="vehicle"]',
+    '#vehicleType',
+    '.vehicle-type select',
+    'select:has(option:text("Car"))'
+)
+
+# Search form submit
+SEARCH_SELECTORS = (
+    'button:has-text("Search")',
+    'button:has-text("Find")',
+    'button[type="submit"]',
+    'input[type="submit"]',
+    'button[data-testid*="search"]',
+    '.search-button',
+    '.btn-search',
+    '.submit-button'
+)
+
+# Results page indicators
+AVAILABILITY_SELECTORS = (
+    'button:has-text("Select")',
+    'button:has-text("Book")',
+    'button:has-text("Continue")',
+    'button:has-text("Choose")',
+    '.available',
+    '.booking-available',
+    '.select-sailing',
+    '.price',
+    '.fare',
+    '.sailing-time:has(.available)',
+    '[data-available="true"]',
+    '.timetable .available'
+)
+UNAVAILABLE_SELECTORS = (
+    ':has-text("Not Available")',
+    ':has-text("Sold Out")',
+    ':has-text("Fully booked")',
+    ':has-text("No sailings")',
+    '.unavailable',
+    '.sold-out',
+    '.no-availability',
+    '.fully-booked'
+)
+RESULTS_SELECTORS = (
+    '.results', '.sailing-results', '.availability', '.no-availability',
+    '.error', '.ferry-times', '.timetable'
+)
+
+# Booking form elements we expect once the start page has been left behind
+BOOKING_FORM_SELECTOR = 'edea-select, input[placeholder="From"], input[type="date"]'
+
+# Results containers that only render once the search has finished. The availability
+# indicators are left out - generic ones like a Continue button or page-wide text can already
+# match on the booking form
+RESULTS_WAIT_SELECTOR = ', '.join(RESULTS_SELECTORS)
+
+# Background thread writing log records, started by the first setup_logging() call
+_LOG_LISTENER = None
+
+# Playwright driver and browser context shared by every check in this process, started on
+# first use by get_browser_context() and torn down by close_browser()
+_PLAYWRIGHT = None
+_CONTEXT = None
+
+# Telegram credentials, read once at import; main() refuses to run without them
+TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+
+# Telegram sends still in flight, drained by wait_for_notifications() before exit
+_PENDING_SENDS = set()
+
+# Pooled HTTP session so repeated Telegram sends reuse the same TLS connection. Only
+# failed connections and rate limits are retried - a 5xx or read timeout may mean the
+# message went out, and retrying that sendMessage POST would send it twice. Retry-After is
+# ignored so a long rate limit can't stall the check.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        read=False,
+        backoff_factor=0.3,
+        status_forcelist=[429],
+        allowed_methods=frozenset({'POST'}),
+        respect_retry_after_header=False
+    )
+))
+
 # Configure logging
 def setup_logging():
-    """Setup logging configuration"""
+    """Setup logging configuration (once per process - later calls just return the logger)"""
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        return logger
+    
     # Create logs directory if it doesn't exist
     os.makedirs('logs', exist_ok=True)
     
     # Configure logging
     log_filename = f"logs/ferry_check_{datetime.now().strftime('%Y%m%d')}.log"
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(log_filename, delay=True)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    # Log calls only enqueue the record; a background thread does the file and console
+    # writes so they never block the event loop. Stopping the listener at exit drains it.
+    log_queue = queue.Queue(-1)
+    _LOG_LISTENER = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    _LOG_LISTENER.start()
+    atexit.register(_LOG_LISTENER.stop)
+    # The queue handler only merges args into the message; formatting happens downstream
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_filename),
-            logging.StreamHandler(sys.stdout)
-        ]
+        format='%(message)s',
+        handlers=[logging.handlers.QueueHandler(log_queue)]
     )
-    return logging.getLogger(__name__)
+    return logger
 
-def send_telegram_message(message):
-    """Send a message via Telegram Bot API"""
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-    chat_id = os.getenv('TELEGRAM_CHAT_ID')
+async def block_unneeded_requests(route):
+    """Abort requests that don't affect the booking form or search results"""
+    request = route.request
+    # Match trackers on the host only so a booking URL mentioning one in its query isn't blocked
+    hostname = urlsplit(request.url).hostname or ''
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in hostname for host in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def wait_for_input_value(page, element, *expected, timeout=3000):
+    """Wait until an input's value is non-empty and contains one of the expected strings"""
+    try:
+        handle = await element.element_handle(timeout=timeout)
+        await page.wait_for_function(
+            """([el, expected]) => {
+                const value = (el.value || '').toLowerCase();
+                return value.length > 0 && (expected.length === 0 || expected.some(e => value.includes(e.toLowerCase())));
+            }""",
+            arg=[handle, list(expected)],
+            timeout=timeout
+        )
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+# In-page selector resolution. Supports plain CSS plus Playwright's :has-text("...") and
+# :visible when they trail the selector; anything else throws so the caller can hand the
+# selector to Playwright's own engine instead. Like Playwright, it searches open shadow roots.
+_QUERY_ALL_JS = """
+// The document then every open shadow root, in the order Playwright's CSS engine visits them
+const queryRoots = (root, css, found) => {
+    found.push(...root.querySelectorAll(css));
+    for (const el of root.querySelectorAll('*')) {
+        if (el.shadowRoot) queryRoots(el.shadowRoot, css, found);
+    }
+    return found;
+};
+// Like Playwright's text matching, ignore script, style and noscript contents and the head,
+// read submit and button inputs by their value and include open shadow root text
+const SKIP_TEXT = 'script, style, noscript, head';
+const textOf = (node) => {
+    if (node.nodeType === Node.TEXT_NODE) return node.nodeValue;
+    if (node.nodeType === Node.ELEMENT_NODE) {
+        if (node.matches(SKIP_TEXT)) return '';
+        if (node.tagName === 'INPUT' && (node.type === 'submit' || node.type === 'button')) return node.value;
+    }
+    let text = '';
+    for (let child = node.firstChild; child; child = child.nextSibling) text += textOf(child);
+    if (node.shadowRoot) text += textOf(node.shadowRoot);
+    return text;
+};
+const queryAll = (sel) => {
+    const m = sel.match(/^(.*?)((?::has-text\\("[^"]*"\\)|:visible)*)$/);
+    const base = m[1].trim() || '*';
+    if (/:has-text|:visible|:text/.test(base)) {
+        throw new Error('unsupported selector: ' + sel);
+    }
+    const texts = [...m[2].matchAll(/:has-text\\("([^"]*)"\\)/g)].map(t => t[1].toLowerCase());
+    const visible = m[2].includes(':visible');
+    return queryRoots(document, base, []).filter(el => {
+        if (texts.length) {
+            if (el.closest(SKIP_TEXT)) return false;
+            const text = textOf(el).replace(/\\s+/g, ' ').toLowerCase();
+            if (!texts.every(t => text.includes(t))) return false;
+        }
+        if (visible) {
+            const rect = el.getBoundingClientRect();
+            if (!rect.width || !rect.height || getComputedStyle(el).visibility === 'hidden') return false;
+        }
+        return true;
+    });
+};
+"""
+
+# Finds the first selector from start that matches and fills or selects it; clicks are left
+# to Playwright. Returns {index, supported} - supported is false when the selector needs
+# Playwright's engine.
+_PICK_ONE_JS = _QUERY_ALL_JS + """
+const isClickable = (el) => {
+    if (el.disabled || el.getAttribute('aria-disabled') === 'true') return false;
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+};
+const setValue = (el, v) => {
+    if (el.tagName === 'SELECT') {
+        const wanted = String(v).toLowerCase();
+        const option = [...el.options].find(o =>
+            o.value.toLowerCase() === wanted || o.label.trim().toLowerCase() === wanted);
+        if (!option) return false;
+        el.value = option.value;
+    } else {
+        el.value = v;
+    }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    return true;
+};
+const pickOne = (selectors, start, action, value) => {
+    for (let i = start; i < selectors.length; i++) {
+        let el;
+        try {
+            const matches = queryAll(selectors[i]);
+            el = action === 'click' ? matches.find(isClickable) : matches[0];
+        } catch (e) {
+            return {index: i, supported: false};
+        }
+        if (!el) continue;
+        if (action === 'fill' || action === 'select') {
+            if (!setValue(el, value)) continue;
+        }
+        return {index: i, supported: true};
+    }
+    return null;
+};
+"""
+
+_PICK_JS = """({selectors, start, action, value}) => {
+""" + _PICK_ONE_JS + """
+    return pickOne(selectors, start, action, value);
+}"""
+
+_PICK_MANY_JS = """(fields) => {
+""" + _PICK_ONE_JS + """
+    const results = {};
+    for (const [name, selectors, action, value] of fields) {
+        results[name] = pickOne(selectors, 0, action, value);
+    }
+    return results;
+}"""
+
+async def _apply_action(element, action, value):
+    """Perform a pick() action through Playwright for clicks and selectors the page can't resolve"""
+    if action == 'click':
+        await element.click()
+    elif action == 'select' or (action == 'fill' and await element.evaluate('el => el.tagName') == 'SELECT'):
+        # One call matching the label or any casing of the value - the first matching option
+        # wins, and a miss no longer waits out the timeout before trying the next form
+        await element.select_option(
+            value=list(dict.fromkeys([value, value.lower(), value.upper()])), label=value
+        )
+    elif action == 'fill':
+        await element.fill(value)
+
+async def pick(page, selectors, action=None, value=None, start=0):
+    """Return the first selector matching the page, optionally clicking, filling or selecting it.
+
+    The whole candidate list is resolved in the browser with a single evaluate call; clicks
+    and selectors using Playwright-specific syntax then go through a locator.
+    """
+    while start < len(selectors):
+        result = await page.evaluate(_PICK_JS, {
+            'selectors': selectors, 'start': start, 'action': action, 'value': value
+        })
+        if result is None:
+            return None
+        selector = selectors[result['index']]
+        if result['supported'] and action != 'click':
+            return selector
+        try:
+            # Clicks need Playwright's actionability checks and real pointer events
+            elements = page.locator(f'{selector} >> visible=true' if action == 'click' else selector)
+            if await elements.count() > 0:
+                await _apply_action(elements.first, action, value)
+                return selector
+        except Exception as e:
+            logger.debug("Failed with selector %s: %s", selector, e)
+        start = result['index'] + 1
+    return None
+
+async def pick_many(page, fields):
+    """Run pick() for several (name, selectors, action, value) fields in one evaluate call.
+
+    Returns a dict mapping each field name to the selector used, or None.
+    """
+    results = await page.evaluate(_PICK_MANY_JS, [list(field) for field in fields])
+    picked = {}
+    for name, selectors, action, value in fields:
+        result = results[name]
+        if result is None:
+            picked[name] = None
+        elif result['supported'] and action != 'click':
+            picked[name] = selectors[result['index']]
+        else:
+            picked[name] = await pick(page, selectors, action, value, start=result['index'])
+    return picked
+
+_COUNT_JS = """({available, unavailable}) => {
+""" + _QUERY_ALL_JS + """
+    const count = (s) => {
+        try {
+            return queryAll(s).length;
+        } catch (e) {
+            return null;
+        }
+    };
+    const counts = {};
+    const result = {counts, text: document.body.innerText};
+    // Any unavailability indicator rules availability out, so stop at the first one
+    for (const s of unavailable) {
+        counts[s] = count(s);
+        if (counts[s]) return result;
+    }
+    for (const s of available) {
+        counts[s] = count(s);
+    }
+    return result;
+}"""
+
+async def read_results_page(page, availability_selectors, unavailable_selectors):
+    """Count indicator matches and return them with the page body text.
+
+    Unavailability selectors are checked first and counting stops at the first match,
+    so selectors that were skipped are missing from the returned counts.
+    """
+    result = await page.evaluate(_COUNT_JS, {
+        'available': availability_selectors, 'unavailable': unavailable_selectors
+    })
+    counts = result['counts']
+    for selectors in (unavailable_selectors, availability_selectors):
+        # Playwright-only syntax the page couldn't resolve - count those concurrently
+        fallback = [selector for selector in selectors if selector in counts and counts[selector] is None]
+        fallback_counts = await asyncio.gather(
+            *(page.locator(selector).count() for selector in fallback), return_exceptions=True
+        )
+        for selector, count in zip(fallback, fallback_counts):
+            if isinstance(count, Exception):
+                logger.debug("Error checking selector %s: %s", selector, count)
+                count = 0
+            counts[selector] = count
+        if any(counts.get(selector) for selector in unavailable_selectors):
+            break
+    return counts, result['text']
+
+async def confirm_value(page, selector):
+    """Return selector once its field holds a value, or None if it was never set"""
+    # Date components (ion-datetime/edea-datepicker) apply an assigned value asynchronously
+    if selector and await wait_for_input_value(page, page.locator(selector).first):
+        return selector
+    return None
+
+async def select_port(page, selectors, port):
+    """Type a port name into the first matching edea-select input and pick it from the dropdown"""
+    selector = await pick(page, selectors)
+    if not selector:
+        return False
+    
+    try:
+        element = page.locator(selector).first
+        
+        # For input fields within edea-select - these are the actual form fields
+        await element.click()
+        
+        # Clear any existing value and type the port name
+        await element.clear()
+        await element.fill(port)
+        
+        # Look for dropdown options that appear
+        option_selectors = [
+            f'div:has-text("{port}"):visible',
+            f'li:has-text("{port}"):visible',
+            f'ion-item:has-text("{port}"):visible',
+            f'.edea-select-option-item:has-text("{port}")',
+            f'[role="option"]:has-text("{port}")',
+            f'button:has-text("{port}"):visible'
+        ]
+        
+        try:
+            # Wait once for the dropdown to open rather than 3s per option selector
+            await page.wait_for_selector(', '.join(option_selectors), timeout=3000)
+            option_selector = await pick(page, option_selectors, 'click')
+            if option_selector:
+                logger.info(f"Selected {port} using: {selector} -> {option_selector}")
+                return True
+        except PlaywrightTimeoutError:
+            pass
+        
+        # If no dropdown appeared, try pressing Enter or Tab
+        await element.press('Enter')
+        # Check if value was accepted
+        if await wait_for_input_value(page, element, port):
+            logger.info(f"Selected {port} by typing and Enter using: {selector}")
+            return True
+        
+        # Try Tab to move to next field (sometimes accepts the value)
+        await element.press('Tab')
+        if await wait_for_input_value(page, element, port):
+            logger.info(f"Selected {port} by typing and Tab using: {selector}")
+            return True
+    except Exception as e:
+        logger.debug("Failed with port selector %s: %s", selector, e)
+    return False
+
+def matched_keywords(pattern, text):
+    """Return the distinct keywords of a compiled pattern found in text, in order of first appearance"""
+    return list(dict.fromkeys(match.group(0).lower() for match in pattern.finditer(text)))
+
+def record_api_requests(page, captured):
+    """Append every XHR/fetch request the page makes to captured, minus credentials"""
+    def on_request(request):
+        if request.resource_type in ('xhr', 'fetch'):
+            captured.append({
+                'method': request.method,
+                'url': request.url,
+                'headers': {k: v for k, v in request.headers.items() if k.lower() not in SENSITIVE_HEADERS},
+                'post_data': request.post_data
+            })
+    page.on('request', on_request)
+
+async def snap(page, name, run_ts):
+    """Save a progress screenshot when FERRY_DEBUG_SCREENSHOT is 1"""
+    if os.getenv('FERRY_DEBUG_SCREENSHOT') == '1':
+        await page.screenshot(path=f'logs/{name}_{run_ts}.jpg', type='jpeg', quality=60)
+
+def probe_api(request_file):
+    """Replay a captured search API request and return False if it reports no availability.
+
+    request_file holds one entry from logs/api_requests_*.json, or a whole capture - its first
+    POST (the search) is replayed. Returns None when the answer is unclear (bad request file,
+    request failed, rate limited, no unavailability keywords) so the caller
+    falls back to the browser check. The response's ETag/Last-Modified are kept so an
+    unchanged answer comes back as a bodiless 304 and reuses the previous verdict.
+    """
+    try:
+        with open(request_file, encoding='utf-8') as f:
+            captured = json.load(f)
+        if isinstance(captured, list):
+            posts = [entry for entry in captured if entry.get('method') == 'POST']
+            captured = (posts or captured)[0]
+        request_key = blake2b(
+            f"{captured['method']} {captured['url']} {captured.get('post_data') or ''}".encode(),
+            digest_size=16
+        ).hexdigest()
+        
+        cached = load_last_result(API_PROBE_CACHE_FILE)
+        if cached and cached.get('key') != request_key:
+            cached = None
+        headers = dict(captured.get('headers') or {})
+        if cached and cached.get('etag'):
+            headers['if-none-match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['if-modified-since'] = cached['last_modified']
+        
+        # Not the Telegram session - a failed probe falls back to the browser, not a retry
+        response = requests.request(
+            captured['method'], captured['url'],
+            headers=headers, data=captured.get('post_data'), timeout=15
+        )
+        response.raise_for_status()
+    except (OSError, ValueError, KeyError, IndexError, TypeError, AttributeError,
+            requests.exceptions.RequestException) as e:
+        logger.warning(f"API probe failed, falling back to the browser: {e}")
+        return None
+    
+    if response.status_code == 304 and cached:
+        logger.info("API probe response not modified since last check - reusing previous verdict")
+        return cached.get('verdict')
     
-    # Get logger instance
-    logger = logging.getLogger(__name__)
+    body_hash = blake2b(response.content, digest_size=16).hexdigest()
+    if cached and cached.get('body_hash') == body_hash:
+        logger.info("API probe response unchanged since last check - reusing previous verdict")
+        verdict = cached.get('verdict')
+    else:
+        keywords = matched_keywords(UNAVAIL_RE, response.text)
+        if keywords:
+            logger.info(f"API probe found unavailability keywords: {keywords}")
+            verdict = False
+        else:
+            verdict = None
+    
+    # Losing the cache only costs the next probe its conditional request
+    try:
+        save_last_result({
+            'key': request_key,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': body_hash,
+            'verdict': verdict
+        }, API_PROBE_CACHE_FILE)
+    except OSError as e:
+        logger.warning(f"Could not save the API probe cache: {e}")
+    if verdict is None:
+        logger.info("API probe inconclusive, falling back to the browser")
+    return verdict
+
+def analyse_results(counts, page_text, availability_selectors, unavailable_selectors):
+    """Decide availability from indicator counts and page text.
+
+    Returns (availability_found, availability_count, keyword_availability).
+    """
+    # Enhanced availability detection
+    availability_found = False
+    
+    unavailable_count = 0
+    for selector in unavailable_selectors:
+        count = counts.get(selector)
+        if count:
+            unavailable_count += count
+            logger.info(f"Found {count} unavailability indicators using: {selector}")
+    
+    availability_count = 0
+    for selector in availability_selectors:
+        count = counts.get(selector)
+        if count:
+            availability_count += count
+            logger.info(f"Found {count} availability indicators using: {selector}")
+    
+    # Text-based availability check - count distinct keywords, unavailability first
+    # since "not available" also contains "available"
+    for keyword in matched_keywords(UNAVAIL_RE, page_text):
+        logger.info(f"Found unavailability keyword: '{keyword}'")
     
-    if not bot_token or not chat_id:
+    keyword_availability = 0
+    if unavailable_count == 0:
+        # Availability keywords only matter when nothing ruled availability out
+        availability_matches = matched_keywords(AVAIL_RE, page_text)
+        for keyword in availability_matches:
+            logger.info(f"Found availability keyword: '{keyword}'")
+        keyword_availability = len(availability_matches)
+    
+    # Decision logic - need strong positive indicators
+    if (availability_count >= 2 or keyword_availability >= 3) and unavailable_count == 0:
+        availability_found = True
+        logger.info("🎉 Strong indication of ferry availability found!")
+    elif availability_count > 0 and unavailable_count == 0 and keyword_availability > 0:
+        availability_found = True
+        logger.info("🎉 Ferry availability found!")
+    else:
+        logger.info(f"❌ No clear availability found. Availability indicators: {availability_count}, Unavailable indicators: {unavailable_count}")
+    
+    return availability_found, availability_count, keyword_availability
+
+def load_last_result(filename=LAST_RESULT_FILE):
+    """Load the previous check's page hash and verdict (or another saved result), if any"""
+    try:
+        with open(filename, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_last_result(result, filename=LAST_RESULT_FILE):
+    """Atomically store this check's page hash and verdict (or another result)"""
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    os.replace(tmp_filename, filename)
+
+def save_results_dump(page_content, run_ts):
+    """Write the results page HTML gzipped to logs/ and prune the oldest dumps"""
+    # Level 1 is close to a plain write and still shrinks HTML several times over
+    with gzip.open(f'logs/results_content_{run_ts}.html.gz', 'wt', encoding='utf-8', compresslevel=1) as f:
+        f.write(page_content)
+    # Timestamped names sort chronologically
+    for old_dump in sorted(glob.glob('logs/results_content_*.html.gz'))[:-MAX_RESULT_DUMPS]:
+        os.remove(old_dump)
+
+def send_no_availability_message():
+    """Queue the routine no-availability notification"""
+    message = f"""ℹ️ CalMac Check Complete - No Availability
+
+Route: Troon → Brodick (03 Aug) / Brodick → Troon (05 Aug)
+Passengers: 1 Adult, 1 Child, 1 Infant + Car
+
+Status: No availability found at this time
+Will check again in 1 hour
+
+Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}"""
+    
+    notify(message)
+
+def notify(message):
+    """Send a Telegram message in a background thread so the check doesn't wait on it"""
+    task = asyncio.create_task(asyncio.to_thread(send_telegram_message, message))
+    _PENDING_SENDS.add(task)
+    task.add_done_callback(_PENDING_SENDS.discard)
+
+async def wait_for_notifications():
+    """Wait for queued Telegram messages to finish sending"""
+    if _PENDING_SENDS:
+        await asyncio.gather(*_PENDING_SENDS, return_exceptions=True)
+
+def send_telegram_message(message):
+    """Send a message via Telegram Bot API"""
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         logger.warning("Telegram credentials not found in environment variables (normal for local testing)")
         logger.info(f"Would send Telegram message: {message}")
         return True  # Return True for local testing
     
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
-        'chat_id': chat_id,
+        'chat_id': TELEGRAM_CHAT_ID,
         'text': message,
         'parse_mode': 'HTML'
     }
     
     try:
-        response = requests.post(url, json=payload, timeout=30)
+        response = _SESSION.post(url, json=payload, timeout=30)
         response.raise_for_status()
         logger.info("Telegram message sent successfully")
         return True
@@ -59,742 +815,288 @@ def send_telegram_message(message):
         logger.error(f"Failed to send Telegram message: {e}")
         return False
 
-async def check_ferry_availability():
-    """Main function to check ferry availability using Playwright"""
-    logger = logging.getLogger(__name__)
+async def launch_browser_context(playwright):
+    """Launch Chromium on the persistent profile and return its browser context"""
+    # Launch browser with additional options for stability. The persistent profile keeps
+    # the HTTP cache and cookies from previous runs so the SPA doesn't load cold.
+    context = await playwright.chromium.launch_persistent_context(
+        PROFILE_DIR,
+        headless=True,  # Back to headless for production
+        args=CHROMIUM_ARGS,
+        ignore_default_args=['--enable-automation'],
+        viewport={'width': 1280, 'height': 720},
+        user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        bypass_csp=True
+    )
+    await context.route('**/*', block_unneeded_requests)
+    return context
+
+async def get_browser_context():
+    """Return the shared browser context, launching Chromium on first use"""
+    global _PLAYWRIGHT, _CONTEXT
+    if _CONTEXT is None:
+        _PLAYWRIGHT = await async_playwright().start()
+        _CONTEXT = await launch_browser_context(_PLAYWRIGHT)
+    return _CONTEXT
+
+async def close_browser():
+    """Close the shared browser context and stop the Playwright driver, if running"""
+    global _PLAYWRIGHT, _CONTEXT
+    if _CONTEXT is not None:
+        await _CONTEXT.close()
+        _CONTEXT = None
+    if _PLAYWRIGHT is not None:
+        await _PLAYWRIGHT.stop()
+        _PLAYWRIGHT = None
+
+# Returns [total, [[tag, attributes, text], ...]] for the first 10 elements matching a selector
+_DESCRIBE_ELEMENTS_JS = """(sel) => {
+    const all = document.querySelectorAll(sel);
+    const described = [...all].slice(0, 10).map(el => [
+        el.tagName.toLowerCase(),
+        [...el.attributes].map(attr => `${attr.name}="${attr.value}"`).join(' '),
+        (el.textContent || '').trim().slice(0, 50)
+    ]);
+    return [all.length, described];
+}"""
+
+async def check_ferry_availability(context=None, use_cached=True):
+    """Main function to check ferry availability using Playwright
+
+    Without a context the shared one from get_browser_context() is used, so repeated
+    checks reuse one browser; call close_browser() when done. With use_cached, a verdict
+    for this trip from the last VERDICT_TTL seconds is returned without checking again.
+    """
+    # Debounce repeat invocations - a verdict for this trip from the last few minutes stands
+    last_result = load_last_result()
+    if (use_cached and last_result and last_result.get('trip') == TRIP
+            and time.time() - last_result.get('checked_at', 0) < VERDICT_TTL):
+        logger.info("Checked less than %d minutes ago - reusing previous verdict, no notification sent",
+                    VERDICT_TTL // 60)
+        return last_result['available']
+    
+    # A replayed search API request answers the common "nothing available" case without
+    # starting a browser; anything else is confirmed through the booking site
+    api_request_file = os.getenv('FERRY_API_REQUEST')
+    if api_request_file and await asyncio.to_thread(probe_api, api_request_file) is False:
+        logger.info("❌ No ferry availability found at this time (API probe)")
+        send_no_availability_message()
+        return False
+    
+    if context is None:
+        context = await get_browser_context()
+    
     logger.info("Starting CalMac ferry availability check...")
     
-    async with async_playwright() as p:
-        # Launch browser with additional options for stability
-        browser = await p.chromium.launch(
-            headless=True,  # Back to headless for production
-            args=[
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        )
-        context = await browser.new_context(
-            viewport={'width': 1280, 'height': 720},
-            user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        page = await context.new_page()
-        
+    page = await context.new_page()
+    try:
         # Add retry logic
         max_retries = 2
         for attempt in range(max_retries):
+            # One timestamp per attempt so its files share a suffix and a retry doesn't
+            # overwrite the screenshots of the attempt that failed
+            run_ts = datetime.now().strftime('%Y%m%d_%H%M%S')
             try:
                 logger.info(f"Attempt {attempt + 1} of {max_retries}")
                 
                 # Navigate to CalMac welcoming page
                 logger.info("Navigating to CalMac welcoming page...")
                 await page.goto('https://ticketing.calmac.co.uk/B2C-Calmac/#/auth/welcoming', 
-                              wait_until='domcontentloaded', timeout=45000)
+                              wait_until='commit', timeout=45000)
                 
-                # Wait for page to load completely and take initial screenshot
-                await page.wait_for_timeout(8000)
-                await page.screenshot(path=f'logs/initial_page_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+                # Wait for the SPA to render its first interactive elements and take initial screenshot
+                await page.wait_for_selector('button, a, input, edea-select', timeout=30000)
+                await snap(page, 'initial_page', run_ts)
                 
                 # Log page info for debugging
                 logger.info(f"Page title: {await page.title()}")
                 logger.info(f"Current URL: {page.url}")
                 
                 # Wait for and look for the main booking interface
-                booking_selectors = [
-                    'button:has-text("Start booking")',
-                    'button:has-text("Book")',
-                    'a:has-text("Start")',
-                    '.start-booking',
-                    '.booking-button',
-                    'button[data-testid*="start"]',
-                    'button[data-testid*="book"]'
-                ]
-                
                 start_button_found = False
-                for selector in booking_selectors:
-                    try:
-                        await page.wait_for_selector(selector, timeout=5000)
-                        await page.click(selector)
+                try:
+                    # Wait once for any of the candidates instead of 5s per selector
+                    await page.wait_for_selector(', '.join(BOOKING_SELECTORS), timeout=5000)
+                    selector = await pick(page, BOOKING_SELECTORS, 'click')
+                    if selector:
                         logger.info(f"Clicked start booking button using: {selector}")
+                        await page.wait_for_selector(BOOKING_FORM_SELECTOR, timeout=15000)
                         start_button_found = True
-                        await page.wait_for_timeout(3000)
-                        break
-                    except PlaywrightTimeoutError:
-                        continue
+                except PlaywrightTimeoutError:
+                    pass
                         
                 if not start_button_found:
                     # Try to navigate directly to the booking form
                     logger.info("No start button found, trying direct navigation to booking form...")
                     await page.goto('https://ticketing.calmac.co.uk/B2C-Calmac/#/desktop/step1/destinations/single', 
-                                  wait_until='domcontentloaded', timeout=30000)
-                    await page.wait_for_timeout(5000)
+                                  wait_until='commit', timeout=30000)
+                    await page.wait_for_selector(BOOKING_FORM_SELECTOR, timeout=30000)
                 
                 # Take screenshot after navigation
-                await page.screenshot(path=f'logs/booking_page_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+                await snap(page, 'booking_page', run_ts)
                 
                 # Debug: Log all available form elements
                 logger.info("=== DEBUG: Available form elements ===")
                 try:
-                    all_inputs = await page.locator('input, select, edea-select, ion-select, button').all()
-                    logger.info(f"Found {len(all_inputs)} form elements")
+                    total, elements = await page.evaluate(_DESCRIBE_ELEMENTS_JS, 'input, select, edea-select, ion-select, button')
+                    logger.info(f"Found {total} form elements")
                     
-                    for i, element in enumerate(all_inputs[:10]):  # Log first 10 elements
-                        try:
-                            tag_name = await element.evaluate('el => el.tagName')
-                            attrs = await element.evaluate('el => Array.from(el.attributes).map(attr => `${attr.name}="${attr.value}"`).join(" ")')
-                            text_content = await element.text_content()
-                            if text_content:
-                                text_content = text_content.strip()[:50]  # First 50 chars
-                            logger.info(f"Element {i+1}: <{tag_name.lower()} {attrs}>{text_content or ''}</{tag_name.lower()}>")
-                        except:
-                            logger.info(f"Element {i+1}: Could not analyze")
+                    for i, (tag_name, attrs, text_content) in enumerate(elements):
+                        logger.info(f"Element {i+1}: <{tag_name} {attrs}>{text_content}</{tag_name}>")
                 except Exception as e:
-                    logger.debug(f"Debug element listing failed: {e}")
+                    logger.debug("Debug element listing failed: %s", e)
                 logger.info("=== END DEBUG ===")
                 
                 # Look for the return journey option first
                 logger.info("Looking for return journey option...")
-                return_selectors = [
-                    'button:has-text("Return")',
-                    'div:has-text("Return") button',
-                    'label:has-text("Return")',
-                    'input[type="radio"][value="return"]',
-                    'input[name="journeyType"][value="return"]',
-                    '.trip-type-btn:has-text("Return")',
-                    '.journey-type:has-text("Return")',
-                    '[data-test-automation*="return"]',
-                    'ion-button:has-text("Return")'
-                ]
-                
-                return_found = False
-                for selector in return_selectors:
-                    try:
-                        return_element = page.locator(selector)
-                        if await return_element.count() > 0:
-                            await return_element.first.click()
-                            logger.info(f"Selected return journey using: {selector}")
-                            return_found = True
-                            await page.wait_for_timeout(2000)
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to select return journey with {selector}: {e}")
-                
-                if not return_found:
+                
+                selector = await pick(page, RETURN_SELECTORS, 'click')
+                if selector:
+                    logger.info(f"Selected return journey using: {selector}")
+                else:
                     logger.warning("Could not find return journey option - may default to single journey")
                 
-                # Select departure port (Troon)
+                # Select departure port
                 logger.info("Looking for departure port selection...")
-                await page.wait_for_timeout(2000)
-                
-                # Updated selectors based on live debug output - target the specific input fields
-                departure_selectors = [
-                    'input[placeholder="From"][data-test-automation*="portlist"]',
-                    'input[placeholder="From"]',
-                    'input[data-test-automation="desktop/step1/destinations/single.edea-select.undefined.input.portlist"]:first-of-type',
-                    'input[data-test-automation*="portlist"]:first-of-type',
-                    'edea-select:first-of-type input[placeholder="From"]',
-                    'edea-select:nth-of-type(1) input'
-                ]
-                
-                departure_selected = False
-                for selector in departure_selectors:
-                    try:
-                        logger.info(f"Trying departure selector: {selector}")
-                        elements = page.locator(selector)
-                        count = await elements.count()
-                        
-                        if count > 0:
-                            element = elements.first
-                            
-                            # For input fields within edea-select - these are the actual form fields
-                            await element.click()
-                            await page.wait_for_timeout(1000)
-                            
-                            # Clear any existing value and type "Troon"
-                            await element.clear()
-                            await element.fill('Troon')
-                            await page.wait_for_timeout(1500)
-                            
-                            # Look for dropdown options that appear
-                            option_selectors = [
-                                'div:has-text("Troon"):visible',
-                                'li:has-text("Troon"):visible', 
-                                'ion-item:has-text("Troon"):visible',
-                                '.edea-select-option-item:has-text("Troon")',
-                                '[role="option"]:has-text("Troon")',
-                                'button:has-text("Troon"):visible'
-                            ]
-                            
-                            option_found = False
-                            for option_selector in option_selectors:
-                                try:
-                                    await page.wait_for_selector(option_selector, timeout=3000)
-                                    option_elements = page.locator(option_selector)
-                                    if await option_elements.count() > 0:
-                                        await option_elements.first.click()
-                                        logger.info(f"Selected Troon using: {selector} -> {option_selector}")
-                                        departure_selected = True
-                                        option_found = True
-                                        break
-                                except Exception as e:
-                                    logger.debug(f"Failed to click Troon option with {option_selector}: {e}")
-                            
-                            if option_found:
-                                break
-                                
-                            # If no dropdown appeared, try pressing Enter or Tab
-                            if not option_found:
-                                await element.press('Enter')
-                                await page.wait_for_timeout(1000)
-                                # Check if value was accepted
-                                value = await element.input_value()
-                                if value and 'troon' in value.lower():
-                                    logger.info(f"Selected Troon by typing and Enter using: {selector}")
-                                    departure_selected = True
-                                    break
-                                else:
-                                    # Try Tab to move to next field (sometimes accepts the value)
-                                    await element.press('Tab')
-                                    await page.wait_for_timeout(1000)
-                                    value = await element.input_value()
-                                    if value and 'troon' in value.lower():
-                                        logger.info(f"Selected Troon by typing and Tab using: {selector}")
-                                        departure_selected = True
-                                        break
-                                
-                    except Exception as e:
-                        logger.debug(f"Failed with departure selector {selector}: {e}")
-                
-                if departure_selected:
-                    await page.wait_for_timeout(2000)
-                else:
-                    logger.warning("Could not select departure port (Troon)")
                 
-                # Select arrival port (Brodick)
+                try:
+                    await page.wait_for_selector(', '.join(DEPARTURE_SELECTORS), state='visible', timeout=10000)
+                except PlaywrightTimeoutError:
+                    logger.warning("Departure port field did not become visible")
+                
+                departure_selected = await select_port(page, DEPARTURE_SELECTORS, DEPARTURE_PORT)
+                
+                if not departure_selected:
+                    logger.warning(f"Could not select departure port ({DEPARTURE_PORT})")
+                
+                # Select arrival port
                 logger.info("Looking for arrival port selection...")
-                await page.wait_for_timeout(2000)
-                
-                # Updated selectors based on live debug output - target the specific input fields
-                arrival_selectors = [
-                    'input[placeholder="To"][data-test-automation*="portlist"]',
-                    'input[placeholder="To"]',
-                    'input[data-test-automation="desktop/step1/destinations/single.edea-select.undefined.input.portlist"]:last-of-type',
-                    'input[data-test-automation*="portlist"]:last-of-type',
-                    'edea-select:last-of-type input[placeholder="To"]',
-                    'edea-select:nth-of-type(2) input'
-                ]
-                
-                arrival_selected = False
-                for selector in arrival_selectors:
-                    try:
-                        logger.info(f"Trying arrival selector: {selector}")
-                        elements = page.locator(selector)
-                        count = await elements.count()
-                        
-                        if count > 0:
-                            element = elements.first
-                            
-                            # For input fields within edea-select - these are the actual form fields
-                            await element.click()
-                            await page.wait_for_timeout(1000)
-                            
-                            # Clear any existing value and type "Brodick"
-                            await element.clear()
-                            await element.fill('Brodick')
-                            await page.wait_for_timeout(1500)
-                            
-                            # Look for dropdown options that appear
-                            option_selectors = [
-                                'div:has-text("Brodick"):visible',
-                                'li:has-text("Brodick"):visible',
-                                'ion-item:has-text("Brodick"):visible',
-                                '.edea-select-option-item:has-text("Brodick")',
-                                '[role="option"]:has-text("Brodick")',
-                                'button:has-text("Brodick"):visible'
-                            ]
-                            
-                            option_found = False
-                            for option_selector in option_selectors:
-                                try:
-                                    await page.wait_for_selector(option_selector, timeout=3000)
-                                    option_elements = page.locator(option_selector)
-                                    if await option_elements.count() > 0:
-                                        await option_elements.first.click()
-                                        logger.info(f"Selected Brodick using: {selector} -> {option_selector}")
-                                        arrival_selected = True
-                                        option_found = True
-                                        break
-                                except Exception as e:
-                                    logger.debug(f"Failed to click Brodick option with {option_selector}: {e}")
-                            
-                            if option_found:
-                                break
-                                
-                            # If no dropdown appeared, try pressing Enter or Tab
-                            if not option_found:
-                                await element.press('Enter')
-                                await page.wait_for_timeout(1000)
-                                # Check if value was accepted
-                                value = await element.input_value()
-                                if value and 'brodick' in value.lower():
-                                    logger.info(f"Selected Brodick by typing and Enter using: {selector}")
-                                    arrival_selected = True
-                                    break
-                                else:
-                                    # Try Tab to move to next field (sometimes accepts the value)
-                                    await element.press('Tab')
-                                    await page.wait_for_timeout(1000)
-                                    value = await element.input_value()
-                                    if value and 'brodick' in value.lower():
-                                        logger.info(f"Selected Brodick by typing and Tab using: {selector}")
-                                        arrival_selected = True
-                                        break
-                                
-                    except Exception as e:
-                        logger.debug(f"Failed with arrival selector {selector}: {e}")
-                
-                if arrival_selected:
-                    await page.wait_for_timeout(2000)
+                
+                # The arrival list is populated from the chosen departure port
+                try:
+                    await page.wait_for_selector(', '.join(ARRIVAL_SELECTORS), state='visible', timeout=10000)
+                except PlaywrightTimeoutError:
+                    logger.warning("Arrival port field did not become visible")
+                
+                arrival_selected = await select_port(page, ARRIVAL_SELECTORS, ARRIVAL_PORT)
+                
+                if not arrival_selected:
+                    logger.warning(f"Could not select arrival port ({ARRIVAL_PORT})")
+                
+                # Dates and passenger counts don't depend on each other, so set them all in one
+                # evaluate - values are assigned in the page with input/change events dispatched
+                logger.info(f"Setting dates ({OUTBOUND_DATE}, {RETURN_DATE}) and passenger details...")
+                form_selectors = await pick_many(page, [
+                    ('outbound date', OUTBOUND_DATE_SELECTORS, 'fill', OUTBOUND_DATE),
+                    ('return date', RETURN_DATE_SELECTORS, 'fill', RETURN_DATE),
+                    ('adults', ADULT_SELECTORS, 'fill', ADULTS),
+                    ('children', CHILD_SELECTORS, 'fill', CHILDREN),
+                    ('infants', INFANT_SELECTORS, 'fill', INFANTS)
+                ])
+                outbound_selector, return_selector = await asyncio.gather(
+                    confirm_value(page, form_selectors.pop('outbound date')),
+                    confirm_value(page, form_selectors.pop('return date'))
+                )
+                
+                if outbound_selector:
+                    logger.info(f"Set outbound date using: {outbound_selector}")
                 else:
-                    logger.warning("Could not select arrival port (Brodick)")
-                
-                # Set outbound date (Sunday, 3 August 2025)
-                logger.info("Setting outbound date: 03/08/2025...")
-                await page.wait_for_timeout(2000)
-                
-                outbound_date_selectors = [
-                    'ion-datetime[data-testid*="departure"]',
-                    'ion-datetime[data-testid*="outbound"]',
-                    'edea-datepicker[data-testid*="departure"]',
-                    'edea-datepicker[data-testid*="outbound"]',
-                    'input[name*="departure"][type="date"]',
-                    'input[name*="outbound"][type="date"]',
-                    'input[data-testid*="departure"]',
-                    'input[data-testid*="outbound"]',
-                    '#departureDate',
-                    '.departure-date input',
-                    '.outbound-date input',
-                    'input[type="date"]:first-of-type'
-                ]
-                
-                outbound_date_set = False
-                for selector in outbound_date_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            element = elements.first
-                            
-                            if 'ion-datetime' in selector or 'edea-datepicker' in selector:
-                                # For Ionic datetime components
-                                await element.click()
-                                await page.wait_for_timeout(1000)
-                                # Try to set the value attribute directly
-                                await element.evaluate('el => el.value = "2025-08-03"')
-                                await page.wait_for_timeout(500)
-                                await element.dispatch_event('change')
-                                logger.info(f"Set outbound date using Ionic component: {selector}")
-                                outbound_date_set = True
-                                break
-                            else:
-                                # Traditional input elements
-                                await element.clear()
-                                await element.fill('2025-08-03')  # ISO format
-                                await page.wait_for_timeout(1000)
-                                
-                                # Verify it was set
-                                value = await element.input_value()
-                                if value and ('2025-08-03' in value or '03/08/2025' in value):
-                                    logger.info(f"Set outbound date using: {selector}")
-                                    outbound_date_set = True
-                                    break
-                                else:
-                                    # Try different format
-                                    await element.clear()
-                                    await element.fill('03/08/2025')
-                                    await page.wait_for_timeout(1000)
-                                    value = await element.input_value()
-                                    if value:
-                                        logger.info(f"Set outbound date (DD/MM/YYYY) using: {selector}")
-                                        outbound_date_set = True
-                                        break
-                                    
-                    except Exception as e:
-                        logger.debug(f"Failed to set outbound date with {selector}: {e}")
-                
-                if not outbound_date_set:
                     logger.warning("Could not set outbound date")
-                
-                # Set return date (Tuesday, 5 August 2025)
-                logger.info("Setting return date: 05/08/2025...")
-                await page.wait_for_timeout(2000)
-                
-                return_date_selectors = [
-                    'input[name*="return"][type="date"]',
-                    'input[name*="arrival"][type="date"]',
-                    'input[data-testid*="return"]',
-                    'input[data-testid*="arrival"]',
-                    '#returnDate',
-                    '.return-date input',
-                    '.arrival-date input',
-                    'input[type="date"]:nth-of-type(2)',
-                    'input[type="date"]:last-of-type'
-                ]
-                
-                return_date_set = False
-                for selector in return_date_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            element = elements.first
-                            await element.clear()
-                            await element.fill('2025-08-05')  # ISO format
-                            await page.wait_for_timeout(1000)
-                            
-                            # Verify it was set
-                            value = await element.input_value()
-                            if value and ('2025-08-05' in value or '05/08/2025' in value):
-                                logger.info(f"Set return date using: {selector}")
-                                return_date_set = True
-                                break
-                            else:
-                                # Try different format
-                                await element.clear()
-                                await element.fill('05/08/2025')
-                                await page.wait_for_timeout(1000)
-                                value = await element.input_value()
-                                if value:
-                                    logger.info(f"Set return date (DD/MM/YYYY) using: {selector}")
-                                    return_date_set = True
-                                    break
-                                    
-                    except Exception as e:
-                        logger.debug(f"Failed to set return date with {selector}: {e}")
-                
-                if not return_date_set:
+                if return_selector:
+                    logger.info(f"Set return date using: {return_selector}")
+                else:
                     logger.warning("Could not set return date")
-                
-                # Set passengers
-                logger.info("Setting passenger details...")
-                await page.wait_for_timeout(2000)
-                
-                # Adults (1)
-                adult_selectors = [
-                    'input[name*="adult"]',
-                    'input[data-testid*="adult"]',
-                    'select[name*="adult"]',
-                    '#adults',
-                    '.adults input',
-                    '.passenger input:first-of-type'
-                ]
-                
-                for selector in adult_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            element = elements.first
-                            if await element.get_attribute('type') == 'number' or 'input' in selector:
-                                await element.clear()
-                                await element.fill('1')
-                            else:  # select element
-                                await element.select_option('1')
-                            logger.info(f"Set adults to 1 using: {selector}")
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to set adults with {selector}: {e}")
-                
-                # Children (1)
-                child_selectors = [
-                    'input[name*="child"]',
-                    'input[data-testid*="child"]',
-                    'select[name*="child"]',
-                    '#children',
-                    '.children input'
-                ]
-                
-                for selector in child_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            element = elements.first
-                            if await element.get_attribute('type') == 'number' or 'input' in selector:
-                                await element.clear()
-                                await element.fill('1')
-                            else:
-                                await element.select_option('1')
-                            logger.info(f"Set children to 1 using: {selector}")
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to set children with {selector}: {e}")
-                
-                # Infants (1)
-                infant_selectors = [
-                    'input[name*="infant"]',
-                    'input[data-testid*="infant"]',
-                    'select[name*="infant"]',
-                    '#infants',
-                    '.infants input'
-                ]
-                
-                for selector in infant_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            element = elements.first
-                            if await element.get_attribute('type') == 'number' or 'input' in selector:
-                                await element.clear()
-                                await element.fill('1')
-                            else:
-                                await element.select_option('1')
-                            logger.info(f"Set infants to 1 using: {selector}")
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to set infants with {selector}: {e}")
+                for passenger_type, selector in form_selectors.items():
+                    if selector:
+                        logger.info(f"Set {passenger_type} using: {selector}")
                 
                 # Add vehicle (Car)
                 logger.info("Adding vehicle: Car...")
-                await page.wait_for_timeout(2000)
                 
                 # Look for add vehicle button first
-                add_vehicle_selectors = [
-                    'button:has-text("Add vehicle")',
-                    'button:has-text("Add car")',
-                    'button[data-testid*="vehicle"]',
-                    '.add-vehicle',
-                    '.vehicle-add'
-                ]
-                
-                vehicle_section_opened = False
-                for selector in add_vehicle_selectors:
+                selector = await pick(page, ADD_VEHICLE_SELECTORS, 'click')
+                if selector:
+                    logger.info(f"Clicked add vehicle button using: {selector}")
                     try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            await elements.first.click()
-                            logger.info(f"Clicked add vehicle button using: {selector}")
-                            vehicle_section_opened = True
-                            await page.wait_for_timeout(2000)
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to click add vehicle with {selector}: {e}")
+                        await page.wait_for_selector(', '.join(CAR_SELECTORS), timeout=5000)
+                    except PlaywrightTimeoutError:
+                        logger.warning("Vehicle type selection did not appear")
                 
                 # Select car type
-                car_selectors = [
-                    'select[name*="vehicle"]',
-                    'select[data-testid*="vehicle"]',
-                    '#vehicleType',
-                    '.vehicle-type select',
-                    'select:has(option:text("Car"))'
-                ]
-                
-                for selector in car_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            element = elements.first
-                            try:
-                                await element.select_option(label='Car')
-                                logger.info(f"Selected Car using: {selector}")
-                                break
-                            except:
-                                try:
-                                    await element.select_option(value='car')
-                                    logger.info(f"Selected car by value using: {selector}")
-                                    break
-                                except:
-                                    continue
-                    except Exception as e:
-                        logger.debug(f"Failed to select car with {selector}: {e}")
+                selector = await pick(page, CAR_SELECTORS, 'select', 'Car')
+                if selector:
+                    logger.info(f"Selected Car using: {selector}")
                 
                 # Take screenshot before submitting
-                await page.screenshot(path=f'logs/before_search_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+                await snap(page, 'before_search', run_ts)
                 
                 # Submit the search
                 logger.info("Submitting ferry search...")
-                await page.wait_for_timeout(2000)
-                
-                search_selectors = [
-                    'button:has-text("Search")',
-                    'button:has-text("Find")',
-                    'button[type="submit"]',
-                    'input[type="submit"]',
-                    'button[data-testid*="search"]',
-                    '.search-button',
-                    '.btn-search',
-                    '.submit-button'
-                ]
-                
-                search_submitted = False
-                for selector in search_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        if await elements.count() > 0:
-                            await elements.first.click()
-                            logger.info(f"Clicked search using: {selector}")
-                            search_submitted = True
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to click search with {selector}: {e}")
-                
-                if not search_submitted:
+                
+                # Record the API calls the search triggers so they can be replayed without a browser
+                api_requests = []
+                if os.getenv('FERRY_CAPTURE_REQUESTS'):
+                    record_api_requests(page, api_requests)
+                
+                selector = await pick(page, SEARCH_SELECTORS, 'click')
+                if selector:
+                    logger.info(f"Clicked search using: {selector}")
+                else:
                     logger.warning("Could not submit search form")
                     # Try pressing Enter on the page
                     await page.keyboard.press('Enter')
                     logger.info("Tried pressing Enter to submit")
                 
-                # Wait for results page to load
+                # Wait for a results container - this returns as soon as one renders instead
+                # of waiting out network idle first
                 logger.info("Waiting for search results...")
-                await page.wait_for_timeout(10000)
-                
-                # Wait for results or error messages
                 try:
-                    await page.wait_for_selector(
-                        '.results, .sailing-results, .availability, .no-availability, .error, .ferry-times, .timetable', 
-                        timeout=30000
-                    )
+                    await page.wait_for_selector(RESULTS_WAIT_SELECTOR, timeout=30000)
                 except PlaywrightTimeoutError:
                     logger.warning("Results page did not load within timeout")
                 
-                # Take screenshot of results
-                await page.screenshot(path=f'logs/results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+                # Take screenshot of results (only when debugging - error screenshots are always kept)
+                await snap(page, 'results', run_ts)
                 
                 # Check for availability
                 logger.info("Checking ferry availability...")
                 
-                # Get page content for analysis
-                page_content = await page.content()
-                page_text = await page.inner_text('body')
+                # Counting stops at the first unavailability indicator that matches, so try the
+                # ones that matched most often in past checks first
+                selector_hits = load_last_result(SELECTOR_HITS_FILE) or {}
+                unavailable_selectors = sorted(
+                    UNAVAILABLE_SELECTORS, key=lambda selector: -selector_hits.get(selector, 0)
+                )
+                
+                # Count every indicator and grab the body text in one round-trip
+                counts, page_text = await read_results_page(
+                    page, AVAILABILITY_SELECTORS, unavailable_selectors
+                )
+                for selector, count in counts.items():
+                    if count:
+                        selector_hits[selector] = selector_hits.get(selector, 0) + 1
+                save_last_result(selector_hits, SELECTOR_HITS_FILE)
                 
                 # Log page info
                 logger.info(f"Results page title: {await page.title()}")
                 logger.info(f"Results page URL: {page.url}")
                 
-                # Enhanced availability detection
-                availability_found = False
-                
-                # Look for specific availability indicators
-                availability_selectors = [
-                    'button:has-text("Select")',
-                    'button:has-text("Book")',
-                    'button:has-text("Continue")',
-                    'button:has-text("Choose")',
-                    '.available',
-                    '.booking-available',
-                    '.select-sailing',
-                    '.price',
-                    '.fare',
-                    '.sailing-time:has(.available)',
-                    '[data-available="true"]',
-                    '.timetable .available'
-                ]
-                
-                availability_count = 0
-                for selector in availability_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        count = await elements.count()
-                        if count > 0:
-                            availability_count += count
-                            logger.info(f"Found {count} availability indicators using: {selector}")
-                    except Exception as e:
-                        logger.debug(f"Error checking availability selector {selector}: {e}")
-                
-                # Check for unavailability indicators
-                unavailable_selectors = [
-                    ':has-text("Not Available")',
-                    ':has-text("Sold Out")',
-                    ':has-text("Fully booked")',
-                    ':has-text("No sailings")',
-                    '.unavailable',
-                    '.sold-out',
-                    '.no-availability',
-                    '.fully-booked'
-                ]
-                
-                unavailable_count = 0
-                for selector in unavailable_selectors:
-                    try:
-                        elements = page.locator(selector)
-                        count = await elements.count()
-                        if count > 0:
-                            unavailable_count += count
-                            logger.info(f"Found {count} unavailability indicators using: {selector}")
-                    except Exception as e:
-                        logger.debug(f"Error checking unavailability selector {selector}: {e}")
-                
-                # Text-based availability check
-                availability_keywords = [
-                    'select sailing', 'book now', 'available', 'choose time',
-                    'price:', '£', 'fare', 'continue to booking'
-                ]
-                unavailable_keywords = [
-                    'not available', 'sold out', 'fully booked', 'no sailings',
-                    'no availability', 'service not operating'
-                ]
-                
-                page_text_lower = page_text.lower()
-                keyword_availability = 0
-                keyword_unavailability = 0
-                
-                for keyword in availability_keywords:
-                    if keyword in page_text_lower:
-                        keyword_availability += 1
-                        logger.info(f"Found availability keyword: '{keyword}'")
-                
-                for keyword in unavailable_keywords:
-                    if keyword in page_text_lower:
-                        keyword_unavailability += 1
-                        logger.info(f"Found unavailability keyword: '{keyword}'")
-                
-                # Decision logic - need strong positive indicators
-                if (availability_count >= 2 or keyword_availability >= 3) and unavailable_count == 0:
-                    availability_found = True
-                    logger.info("🎉 Strong indication of ferry availability found!")
-                elif availability_count > 0 and unavailable_count == 0 and keyword_availability > 0:
-                    availability_found = True
-                    logger.info("🎉 Ferry availability found!")
-                else:
-                    logger.info(f"❌ No clear availability found. Availability indicators: {availability_count}, Unavailable indicators: {unavailable_count}")
+                if api_requests:
+                    requests_path = f'logs/api_requests_{run_ts}.json'
+                    with open(requests_path, 'w', encoding='utf-8') as f:
+                        json.dump(api_requests, f, indent=2)
+                    logger.info(f"Saved {len(api_requests)} search API requests to {requests_path}")
                 
-                # Save detailed results for debugging
-                with open(f'logs/results_content_{datetime.now().strftime("%Y%m%d_%H%M%S")}.html', 'w', encoding='utf-8') as f:
-                    f.write(page_content)
+                # Most checks see the same page as last time - skip re-saving an identical
+                # HTML dump for those
+                page_hash = blake2b(page_text.encode(), digest_size=16).hexdigest()
+                page_unchanged = bool(last_result) and last_result.get('hash') == page_hash
+                # The full HTML is only fetched for the debug dump of a changed page
+                page_content = None if page_unchanged else await page.content()
                 
-                # If availability found, send Telegram notification
-                if availability_found:
-                    logger.info("🎉 Ferry availability FOUND!")
-                    
-                    message = f"""🚢 CalMac Alert! Your ferry is now available:
-
-Outbound: Troon → Brodick on Sun 03 Aug @ 07:45  
-Return: Brodick → Troon on Tue 05 Aug @ 15:30  
-Passengers: 1 Adult, 1 Child, 1 Infant + Car
-
-Book now: https://ticketing.calmac.co.uk/B2C-Calmac/
-
-Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
-Availability indicators found: {availability_count}
-Keywords matched: {keyword_availability}"""
-                    
-                    send_telegram_message(message)
-                    return True
-                else:
-                    logger.info("❌ No ferry availability found at this time")
-                    
-                    # Send notification for no availability as well
-                    no_availability_message = f"""ℹ️ CalMac Check Complete - No Availability
-
-Route: Troon → Brodick (03 Aug) / Brodick → Troon (05 Aug)
-Passengers: 1 Adult, 1 Child, 1 Infant + Car
-
-Status: No availability found at this time
-Will check again in 1 hour
-
-Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}"""
-                    
-                    send_telegram_message(no_availability_message)
-                    return False
+                # The results page was reached - anything from here on is a verdict, not a
+                # navigation failure worth repeating the whole browser run for
+                break
                 
             except PlaywrightTimeoutError as e:
                 logger.error(f"Timeout error on attempt {attempt + 1}: {e}")
@@ -808,7 +1110,7 @@ Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}"""
                 logger.error(f"Error on attempt {attempt + 1}: {e}")
                 # Take screenshot on error
                 try:
-                    await page.screenshot(path=f'logs/error_attempt_{attempt + 1}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+                    await page.screenshot(path=f'logs/error_attempt_{attempt + 1}_{run_ts}.jpg', type='jpeg', quality=60)
                 except:
                     pass
                 if attempt < max_retries - 1:
@@ -818,8 +1120,54 @@ Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}"""
                 else:
                     return False
         
-        await browser.close()
-        return False
+        # Only reached once an attempt got through to the results page
+        # Always analysed - the hash only covers the page text, not the selector counts
+        availability_found, availability_count, keyword_availability = analyse_results(
+            counts, page_text, AVAILABILITY_SELECTORS, UNAVAILABLE_SELECTORS
+        )
+        
+        # Save detailed results for debugging
+        if page_unchanged:
+            logger.info("Results page unchanged since last check - not saving another dump")
+        else:
+            save_results_dump(page_content, run_ts)
+        
+        # Saved on every check so the timestamp keeps repeat invocations debounced
+        save_last_result({
+            'trip': TRIP,
+            'checked_at': time.time(),
+            'hash': page_hash,
+            'available': availability_found,
+            'availability_count': availability_count,
+            'keyword_availability': keyword_availability
+        })
+        
+        # If availability found, send Telegram notification
+        if availability_found:
+            logger.info("🎉 Ferry availability FOUND!")
+            
+            message = f"""🚢 CalMac Alert! Your ferry is now available:
+
+Outbound: Troon → Brodick on Sun 03 Aug @ 07:45  
+Return: Brodick → Troon on Tue 05 Aug @ 15:30  
+Passengers: 1 Adult, 1 Child, 1 Infant + Car
+
+Book now: https://ticketing.calmac.co.uk/B2C-Calmac/
+
+Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
+Availability indicators found: {availability_count}
+Keywords matched: {keyword_availability}"""
+            
+            notify(message)
+            return True
+        else:
+            logger.info("❌ No ferry availability found at this time")
+            
+            # Send notification for no availability as well
+            send_no_availability_message()
+            return False
+    finally:
+        await page.close()
 
 async def main():
     """Main entry point"""
@@ -830,19 +1178,43 @@ async def main():
     logger.info(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
     logger.info("=" * 50)
     
+    # Fail at startup rather than after a full browser run with nowhere to send the result
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+        logger.error("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID must be set (use test_local.py to run without Telegram)")
+        sys.exit(1)
+    
+    # Seconds between checks; 0 (the default, used by the scheduled workflow) checks once
+    interval = int(os.getenv('FERRY_CHECK_INTERVAL', '0'))
+    
     try:
-        availability_found = await check_ferry_availability()
-        
-        if availability_found:
-            logger.info("✅ Check completed: Availability found and notification sent!")
-            sys.exit(0)
-        else:
-            logger.info("ℹ️  Check completed: No availability at this time")
-            sys.exit(0)
+        # Every check reuses the browser launched by the first one that needs it
+        try:
+            # Only the first check may reuse a recent verdict - later ones are due by the interval
+            use_cached = True
+            while True:
+                availability_found = await check_ferry_availability(use_cached=use_cached)
+                use_cached = False
+                
+                if availability_found:
+                    logger.info("✅ Check completed: Availability found!")
+                else:
+                    logger.info("ℹ️  Check completed: No availability at this time")
+                
+                if not interval:
+                    break
+                logger.info(f"Next check in {interval} seconds")
+                await asyncio.sleep(interval)
+        finally:
+            # Let queued notifications finish while the browser shuts down
+            await asyncio.gather(wait_for_notifications(), close_browser())
+        sys.exit(0)
             
     except Exception as e:
         logger.error(f"Fatal error in main: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
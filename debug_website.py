@@ -6,28 +6,33 @@ This script helps us understand the current structure of the CalMac website
 
 import asyncio
 import os
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from datetime import datetime
+from check_availability import CHROMIUM_ARGS, block_unneeded_requests
 
 async def debug_calmac_website():
     """Debug the CalMac website structure"""
     print("🔍 Starting CalMac website analysis...")
     
+    # One timestamp for every file this run writes, and the directory they go in - created
+    # up front so the error screenshot can be saved even if navigation fails
+    run_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('debug', exist_ok=True)
+    
     async with async_playwright() as p:
         # Launch browser in non-headless mode for debugging
         browser = await p.chromium.launch(
             headless=False,  # Set to True for headless mode
-            args=[
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu'
-            ]
+            args=CHROMIUM_ARGS,
+            ignore_default_args=['--enable-automation']
         )
         context = await browser.new_context(
             viewport={'width': 1280, 'height': 720},
             user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         )
+        # Block the same images, fonts, media and trackers as the checker so the page
+        # inspected here is the one it actually sees
+        await context.route('**/*', block_unneeded_requests)
         page = await context.new_page()
         
         try:
@@ -36,8 +41,11 @@ async def debug_calmac_website():
             await page.goto('https://ticketing.calmac.co.uk/B2C-Calmac/#/desktop/step1/destinations/single', 
                           wait_until='domcontentloaded', timeout=45000)
             
-            # Wait for page to load
-            await page.wait_for_timeout(10000)
+            # Wait for the booking form to render
+            try:
+                await page.wait_for_selector('edea-select, input, select, button', timeout=30000)
+            except PlaywrightTimeoutError:
+                print("⚠️ Booking form did not render within 30 seconds")
             
             # Log basic page info
             title = await page.title()
@@ -46,26 +54,25 @@ async def debug_calmac_website():
             print(f"🔗 Current URL: {url}")
             
             # Take a screenshot
-            os.makedirs('debug', exist_ok=True)
-            screenshot_path = f'debug/calmac_page_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-            await page.screenshot(path=screenshot_path, full_page=True)
+            # JPEG of the viewport only - much cheaper to encode than a full-page PNG, and the
+            # saved HTML below covers anything further down the page
+            screenshot_path = f'debug/calmac_page_{run_ts}.jpg'
+            await page.screenshot(path=screenshot_path, type='jpeg', quality=60)
             print(f"📸 Screenshot saved: {screenshot_path}")
             
             # Save page content
             content = await page.content()
-            content_path = f'debug/calmac_content_{datetime.now().strftime("%Y%m%d_%H%M%S")}.html'
+            content_path = f'debug/calmac_content_{run_ts}.html'
             with open(content_path, 'w', encoding='utf-8') as f:
                 f.write(content)
             print(f"💾 Page content saved: {content_path}")
             
-            # Analyze forms
-            forms = await page.locator('form').count()
+            # Analyze forms and look for input fields - the counts are independent, so
+            # request them all at once
+            forms, inputs, selects, buttons = await asyncio.gather(
+                *(page.locator(tag).count() for tag in ('form', 'input', 'select', 'button'))
+            )
             print(f"📝 Found {forms} form elements")
-            
-            # Look for input fields
-            inputs = await page.locator('input').count()
-            selects = await page.locator('select').count()
-            buttons = await page.locator('button').count()
             print(f"📝 Found {inputs} input fields, {selects} select dropdowns, {buttons} buttons")
             
             # Look for common booking elements
@@ -84,15 +91,17 @@ async def debug_calmac_website():
             ]
             
             print("\n🔍 Looking for booking-related elements:")
-            for selector in booking_elements:
-                try:
-                    count = await page.locator(selector).count()
-                    if count > 0:
-                        print(f"  ✅ {selector}: {count} elements found")
-                    else:
-                        print(f"  ❌ {selector}: not found")
-                except Exception as e:
-                    print(f"  ⚠️ {selector}: error - {e}")
+            counts = await asyncio.gather(
+                *(page.locator(selector).count() for selector in booking_elements),
+                return_exceptions=True
+            )
+            for selector, count in zip(booking_elements, counts):
+                if isinstance(count, Exception):
+                    print(f"  ⚠️ {selector}: error - {count}")
+                elif count > 0:
+                    print(f"  ✅ {selector}: {count} elements found")
+                else:
+                    print(f"  ❌ {selector}: not found")
             
             # Check for any text that mentions Troon or Brodick
             page_text = await page.inner_text('body')
@@ -113,7 +122,7 @@ async def debug_calmac_website():
         except Exception as e:
             print(f"❌ Error during website analysis: {e}")
             # Take screenshot on error
-            await page.screenshot(path=f'debug/error_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+            await page.screenshot(path=f'debug/error_{run_ts}.jpg', type='jpeg', quality=60)
         finally:
             await browser.close()
 
@@ -6,27 +6,35 @@ Use this to test the automation locally before deploying
 
 import os
 import asyncio
-from check_availability import check_ferry_availability, setup_logging
+
+# Credentials are read when check_availability is imported - clear them first so messages
+# are only logged, never sent
+os.environ.pop('TELEGRAM_BOT_TOKEN', None)
+os.environ.pop('TELEGRAM_CHAT_ID', None)
+
+from check_availability import check_ferry_availability, close_browser, setup_logging, wait_for_notifications
 
 async def test_ferry_checker():
     """Test the ferry checker with debug output"""
     logger = setup_logging()
     
-    # Set dummy credentials for testing (won't send actual messages)
-    os.environ['TELEGRAM_BOT_TOKEN'] = 'test_token'
-    os.environ['TELEGRAM_CHAT_ID'] = 'test_chat_id'
+    # Keep the step screenshots and the search API requests for local debugging
+    os.environ.setdefault('FERRY_DEBUG_SCREENSHOT', '1')
+    os.environ.setdefault('FERRY_CAPTURE_REQUESTS', '1')
     
     logger.info("🧪 Starting test run of CalMac ferry checker...")
     logger.info("Note: This is a test run - no actual Telegram messages will be sent")
     
     try:
-        result = await check_ferry_availability()
+        result = await check_ferry_availability(use_cached=False)
         if result:
             logger.info("✅ Test completed: Availability found!")
         else:
             logger.info("❌ Test completed: No availability found")
     except Exception as e:
         logger.error(f"❌ Test failed with error: {e}")
+    finally:
+        await asyncio.gather(wait_for_notifications(), close_browser())
         
     logger.info("🧪 Test run completed. Check the logs/ directory for screenshots and detailed logs.")
 